@@ -17,13 +17,24 @@ import os
 import sys
 import json
 import time
-import glob
+import random
+import hashlib
 import argparse
+import multiprocessing
+import queue
+import threading
 import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import fitz  # pymupdf
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson  # optional: much faster JSON parsing/serialization
+except ImportError:
+    orjson = None
 
 # ──────────────────── Config ────────────────────
 
@@ -32,12 +43,18 @@ MODEL = "google/gemini-2.5-flash"          # Change to your preferred model
 API_URL = "https://openrouter.ai/api/v1/chat/completions"
 ZOTERO_STORAGE = os.path.expanduser("~/Zotero/storage")
 OUTPUT_FILENAME = "analysis.json"
+TEXT_CACHE_FILENAME = ".text_cache.json"   # extracted text, reused while the PDF is unchanged
 
-MAX_TEXT_CHARS = 30000       # Max characters extracted per PDF (~7,500 tokens)
+MAX_TEXT_BYTES = 30000       # Max UTF-8 bytes of text sent per PDF (~7,500 tokens, any language)
+MAX_PDF_BYTES = 200 * 1024 * 1024  # Larger PDFs are skipped rather than read into memory
+MAX_PAGES = 30               # Pages read per PDF; 30 pages almost always exceed MAX_TEXT_BYTES
+SCANNED_PAGE_CHARS = 20      # Fewer chars on page 1 and a sample page → treated as scanned
 MAX_RETRIES = 3
-RETRY_DELAY = 5              # seconds
-CONCURRENCY = 5              # concurrent requests (currently unused; serial by default)
-RATE_LIMIT_DELAY = 0.5       # seconds between requests (increase if you hit 429s)
+RETRY_DELAY = 5              # base backoff in seconds, doubled on each retry (plus jitter)
+MAX_RETRY_DELAY = 60         # cap on any single backoff or Retry-After wait
+BATCH_SIZE = 1               # papers per LLM call (override with --batch-size; keep ≤ 5)
+CONCURRENCY = 5              # papers processed in parallel (override with --concurrency)
+RATE_LIMIT_DELAY = 0.5       # min seconds between request starts, shared by all workers
 
 # ──────────────────── Prompts ────────────────────
 # IMPORTANT: Replace this with your topic-specific system prompt.
@@ -129,58 +146,216 @@ Filename: {filename}
 
 Output strictly in JSON format as specified. No other text."""
 
+# Used when --batch-size > 1: several papers share one request (and one copy
+# of SYSTEM_PROMPT), and the model returns one analysis object per paper.
+BATCH_USER_PROMPT_TEMPLATE = """Please analyze each of the following {count} academic papers and extract structured information.
+
+{papers}
+
+Output a single JSON object of the form {{"papers": [...]}}, where "papers" holds exactly \
+{count} analysis objects, one per paper above, each following the format specified plus \
+a "paper_index" field set to that paper's number from its PAPER header. No other text."""
+
+BATCH_PAPER_TEMPLATE = """===== PAPER {index} ({filename}) =====
+{text}
+===== END OF PAPER {index} ====="""
+
+# SYSTEM_PROMPT is identical in every request, so mark it cacheable: providers
+# that support prompt caching (Anthropic, Gemini via OpenRouter) then reuse it
+# instead of re-processing it, and bill cached tokens at a discount.
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": [
+        {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+    ],
+}
+
 # ──────────────────── Core Functions ────────────────────
 
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_bytes(obj, indent: bool = False) -> bytes:
+    """UTF-8 JSON (non-ASCII kept as-is), pretty-printed if indent."""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+class RateLimiter:
+    """Space out request starts across all worker threads."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def defer(self, seconds: float):
+        """Hold back every worker's next request by at least `seconds`."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+rate_limiter = RateLimiter(RATE_LIMIT_DELAY)
+
+# One keep-alive session shared by all workers, so each request reuses a
+# pooled connection instead of paying a fresh TCP + TLS handshake.
+SESSION = requests.Session()
+SESSION.headers.update({
+    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+    "Content-Type": "application/json",
+    "HTTP-Referer": "https://github.com/your-repo",  # Optional: update with your repo
+})
+
+
+def size_connection_pool(size: int):
+    """Keep up to `size` idle connections to the API (one per worker)."""
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size, max_retries=0)
+    SESSION.mount("https://", adapter)
+
+
+size_connection_pool(CONCURRENCY)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given (0-based) attempt."""
+    return min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** attempt + random.uniform(0, 1))
+
+
+def retry_after_delay(resp, attempt: int) -> float:
+    """Seconds to wait after a 429: the server's Retry-After if given, else backoff."""
+    try:
+        return min(MAX_RETRY_DELAY, max(0.0, float(resp.headers["Retry-After"])))
+    except (KeyError, TypeError, ValueError):  # missing, or an HTTP-date
+        return backoff_delay(attempt)
+
+
+# Plain text only: skip ligature preservation and image blocks, which the LLM doesn't need
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES & ~fitz.TEXT_PRESERVE_IMAGES
+
+
 def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from PDF, capped at MAX_TEXT_CHARS."""
+    """Extract text from PDF, capped at MAX_TEXT_BYTES of UTF-8.
+
+    The cap is in bytes rather than characters because tokens track bytes
+    more closely: 30k characters of Chinese is ~90k bytes and ~3x the tokens.
+    """
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-            if len(text) > MAX_TEXT_CHARS:
-                text = text[:MAX_TEXT_CHARS]
-                text += "\n\n[Text truncated — above is the first portion]"
+        if os.path.getsize(pdf_path) > MAX_PDF_BYTES:
+            return f"[PDF text extraction failed: file exceeds {MAX_PDF_BYTES >> 20} MB]"
+        # One bulk read, then MuPDF parses from memory instead of issuing
+        # many small reads (slow on network-synced Zotero storage)
+        with open(pdf_path, "rb") as f:
+            doc = fitz.open(stream=f.read(), filetype="pdf")
+        parts = []
+        size = 0
+        truncated = False
+        for page in doc.pages(0, min(MAX_PAGES, doc.page_count)):
+            page_text = page.get_text("text", flags=TEXT_FLAGS)
+            if page.number == 0 and len(page_text.strip()) < SCANNED_PAGE_CHARS:
+                # No text layer on page 1: check one more page (the first may just
+                # be an image cover) and give up early on scans instead of
+                # walking every page
+                probe = doc[min(2, doc.page_count - 1)].get_text("text", flags=TEXT_FLAGS)
+                if len(probe.strip()) < SCANNED_PAGE_CHARS:
+                    doc.close()
+                    return ""
+            data = page_text.encode("utf-8", "ignore")
+            if size + len(data) > MAX_TEXT_BYTES:
+                parts.append(data[:MAX_TEXT_BYTES - size])
+                truncated = True
                 break
+            parts.append(data)
+            size += len(data)
+        else:
+            truncated = doc.page_count > MAX_PAGES  # stopped at the page limit instead
         doc.close()
+        # "ignore" drops a character the byte cut may have split in half
+        text = b"".join(parts).decode("utf-8", "ignore")
+        if truncated:
+            text += "\n\n[Text truncated — above is the first portion]"
         return text.strip()
     except Exception as e:
         return f"[PDF text extraction failed: {str(e)}]"
 
 
-def call_llm(text: str, filename: str) -> dict:
-    """Send paper text to LLM and return parsed JSON result."""
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://github.com/your-repo",  # Optional: update with your repo
-    }
+# PyMuPDF holds the GIL and isn't thread-safe, so worker threads hand PDF
+# parsing to this process pool (created in main), which runs it in parallel.
+extract_pool = None
 
-    payload = {
-        "model": MODEL,
-        "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": USER_PROMPT_TEMPLATE.format(
-                filename=filename, text=text
-            )},
-        ],
-        "temperature": 0.1,   # Low temperature for consistent extraction
-        "max_tokens": 2000,
-        "response_format": {"type": "json_object"},
-    }
 
+def run_extraction(pdf_path: str) -> str:
+    if extract_pool is None:
+        return extract_text_from_pdf(pdf_path)
+    return extract_pool.submit(extract_text_from_pdf, pdf_path).result()
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_text(pdf_path: str, folder_path: str):
+    """Return (text, pdf_sha256), reusing the folder's text cache if the PDF is unchanged.
+
+    Raises OSError if the PDF itself can't be read.
+    """
+    cache_path = os.path.join(folder_path, TEXT_CACHE_FILENAME)
+    pdf_sha256 = file_sha256(pdf_path)
+    try:
+        with open(cache_path, "rb") as f:
+            cache = json_loads(f.read())
+        if cache.get("pdf_sha256") == pdf_sha256:
+            return cache["text"], pdf_sha256
+    except (OSError, ValueError, KeyError):
+        pass  # no cache yet, or unreadable — extract again
+
+    text = run_extraction(pdf_path)
+    if not text.startswith("[PDF text extraction failed"):
+        try:
+            with open(cache_path, "wb") as f:
+                f.write(json_bytes({
+                    "pdf_sha256": pdf_sha256,
+                    "text": text,
+                    "extracted_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                }))
+        except OSError:
+            pass  # caching is best-effort
+    return text, pdf_sha256
+
+
+def request_completion(payload: dict, label: str):
+    """POST a chat completion with retries.
+
+    Returns (parsed JSON content, usage dict), or None if every attempt failed.
+    """
     for attempt in range(MAX_RETRIES):
         try:
-            resp = requests.post(API_URL, headers=headers, json=payload, timeout=120)
+            rate_limiter.wait()
+            resp = SESSION.post(API_URL, data=json_bytes(payload), timeout=120)
 
             if resp.status_code == 429:
-                wait = RETRY_DELAY * (attempt + 2)
-                print(f"  ⏳ Rate limited, waiting {wait}s...")
-                time.sleep(wait)
+                wait = retry_after_delay(resp, attempt)
+                print(f"  ⏳ {label[:50]}: rate limited, waiting {wait:.1f}s...")
+                # Back off all workers, not just this one, or they keep hitting the limit
+                rate_limiter.defer(wait)
                 continue
 
             resp.raise_for_status()
-            data = resp.json()
+            data = json_loads(resp.content)
 
             content = data["choices"][0]["message"]["content"]
             # Strip markdown code block if present
@@ -191,82 +366,319 @@ def call_llm(text: str, filename: str) -> dict:
                 content = content[:-3]
             content = content.strip()
 
-            result = json.loads(content)
-
-            # Record token usage
-            usage = data.get("usage", {})
-            result["_meta"] = {
-                "input_tokens": usage.get("prompt_tokens", 0),
-                "output_tokens": usage.get("completion_tokens", 0),
-                "model": MODEL,
-                "analyzed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-            }
-
-            return result
+            return json_loads(content), data.get("usage", {})
 
         except json.JSONDecodeError as e:
-            print(f"  ⚠️ JSON parse error (attempt {attempt+1}/{MAX_RETRIES}): {e}")
+            print(f"  ⚠️ {label[:50]}: JSON parse error (attempt {attempt+1}/{MAX_RETRIES}): {e}")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(backoff_delay(attempt))
         except requests.exceptions.RequestException as e:
-            print(f"  ⚠️ API request failed (attempt {attempt+1}/{MAX_RETRIES}): {e}")
+            print(f"  ⚠️ {label[:50]}: API request failed (attempt {attempt+1}/{MAX_RETRIES}): {e}")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(backoff_delay(attempt))
         except (KeyError, IndexError) as e:
-            print(f"  ⚠️ Unexpected response format (attempt {attempt+1}/{MAX_RETRIES}): {e}")
+            print(f"  ⚠️ {label[:50]}: Unexpected response format (attempt {attempt+1}/{MAX_RETRIES}): {e}")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                time.sleep(backoff_delay(attempt))
 
-    return {"error": f"Failed after {MAX_RETRIES} attempts", "filename": filename}
+    return None
 
 
-def process_one(folder_path: str) -> dict:
-    """Process one Zotero storage folder."""
+def make_meta(usage: dict, batch_size: int = 1) -> dict:
+    """Token usage record; batched calls split the totals evenly per paper."""
+    cached = ((usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+              or usage.get("cache_read_input_tokens") or 0)
+    meta = {
+        "input_tokens": usage.get("prompt_tokens", 0) // batch_size,
+        "cached_input_tokens": cached // batch_size,
+        "output_tokens": usage.get("completion_tokens", 0) // batch_size,
+        "model": MODEL,
+        "analyzed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if batch_size > 1:
+        meta["batch_size"] = batch_size
+    return meta
+
+
+def call_llm(text: str, filename: str) -> dict:
+    """Send paper text to LLM and return parsed JSON result."""
+    payload = {
+        "model": MODEL,
+        "messages": [
+            SYSTEM_MESSAGE,
+            {"role": "user", "content": USER_PROMPT_TEMPLATE.format(
+                filename=filename, text=text
+            )},
+        ],
+        "temperature": 0.1,   # Low temperature for consistent extraction
+        "max_tokens": 2000,
+        "response_format": {"type": "json_object"},
+    }
+
+    reply = request_completion(payload, filename)
+    if reply is None:
+        return {"error": f"Failed after {MAX_RETRIES} attempts", "filename": filename}
+
+    result, usage = reply
+    result["_meta"] = make_meta(usage)  # Record token usage
+    return result
+
+
+def call_llm_batch(papers: list) -> list:
+    """Analyze several (filename, text) papers in one LLM call.
+
+    Returns one result per paper, in order. Analyses are matched to papers by
+    their "paper_index", not their position; if the reply doesn't hold exactly
+    one analysis per paper index, falls back to a separate call_llm for each.
+    """
+    blocks = [
+        BATCH_PAPER_TEMPLATE.format(index=i, filename=filename, text=text)
+        for i, (filename, text) in enumerate(papers, 1)
+    ]
+    payload = {
+        "model": MODEL,
+        "messages": [
+            SYSTEM_MESSAGE,
+            {"role": "user", "content": BATCH_USER_PROMPT_TEMPLATE.format(
+                count=len(papers), papers="\n\n".join(blocks)
+            )},
+        ],
+        "temperature": 0.1,
+        "max_tokens": 2000 * len(papers),
+        "response_format": {"type": "json_object"},
+    }
+
+    label = f"batch of {len(papers)} ({papers[0][0]}, ...)"
+    reply = request_completion(payload, label)
+    if reply is not None:
+        content, usage = reply
+        results = content.get("papers") if isinstance(content, dict) else None
+        by_index = {}
+        if isinstance(results, list) and len(results) == len(papers):
+            for result in results:
+                try:
+                    by_index[int(result.pop("paper_index"))] = result
+                except (AttributeError, KeyError, TypeError, ValueError):
+                    break  # not an analysis object, or no usable paper index
+        if sorted(by_index) == list(range(1, len(papers) + 1)):  # each paper exactly once
+            ordered = [by_index[i] for i in range(1, len(papers) + 1)]
+            for result in ordered:
+                result["_meta"] = make_meta(usage, len(papers))
+            return ordered
+        print(f"  ⚠️ {label[:50]}: reply doesn't match the batch, retrying papers one by one")
+
+    return [call_llm(text, filename) for filename, text in papers]
+
+
+def write_result(output_path: str, data: bytes):
+    """Write analysis.json atomically, so an interrupted write never leaves a
+    truncated file that later runs would treat as already analyzed."""
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# analysis.json files are written by one background thread (started in main),
+# so workers move on to their next paper instead of waiting on the disk,
+# which is often a network-synced Zotero folder.
+write_queue = None
+write_failures = []   # output paths the writer couldn't write, reported as errors in main
+
+
+def _write_worker():
+    while True:
+        output_path, data = write_queue.get()
+        try:
+            write_result(output_path, data)
+        except Exception as e:  # keep the thread alive for the papers queued behind this one
+            print(f"  ❌ Could not write {output_path}: {e}")
+            write_failures.append(output_path)
+        finally:
+            write_queue.task_done()
+
+
+def start_writer():
+    global write_queue
+    write_queue = queue.Queue()
+    threading.Thread(target=_write_worker, daemon=True).start()
+
+
+def save_result(output_path: str, result: dict):
+    """Save a result as analysis.json; raises TypeError/ValueError if it can't be serialized.
+
+    Serializing here, in the caller's thread, means a bad result never
+    reaches the writer, and never leaves a half-written file behind.
+    """
+    data = json_bytes(result, indent=True)
+    if write_queue is None:
+        write_result(output_path, data)
+    else:
+        write_queue.put((output_path, data))
+
+
+def scan_folder(folder_path: str):
+    """List a folder once: return (folder_path, first PDF path or None, analyzed?)."""
+    pdf_path = None
+    done = False
+    try:
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                name = entry.name
+                if name == OUTPUT_FILENAME:
+                    done = True
+                elif (pdf_path is None and name.lower().endswith(".pdf")
+                      and not name.startswith(".") and entry.is_file()):
+                    pdf_path = entry.path
+    except OSError:
+        pass  # missing/unreadable folder counts as having no PDF
+    return folder_path, pdf_path, done
+
+
+def prepare_one(folder_path: str) -> dict:
+    """Run the steps before the LLM call for one Zotero storage folder.
+
+    Returns a final status (skipped / no_pdf / too_short / error), or status
+    "ready" with the extracted text for the LLM step.
+    """
     folder_name = os.path.basename(folder_path)
     output_path = os.path.join(folder_path, OUTPUT_FILENAME)
 
-    # Skip if already processed
-    if os.path.exists(output_path):
+    # One directory listing answers both: already processed? which PDF?
+    _, pdf_path, done = scan_folder(folder_path)
+    if done:
         return {"status": "skipped", "folder": folder_name}
-
-    # Find PDF
-    pdfs = glob.glob(os.path.join(folder_path, "*.pdf"))
-    if not pdfs:
+    if pdf_path is None:
         return {"status": "no_pdf", "folder": folder_name}
 
-    pdf_path = pdfs[0]
     filename = os.path.basename(pdf_path)
 
-    # Extract text
-    text = extract_text_from_pdf(pdf_path)
+    # Extract text (or reuse it from a previous run)
+    try:
+        text, pdf_sha256 = load_text(pdf_path, folder_path)
+    except OSError as e:
+        # Unreadable right now (I/O error, locked, deleted since the scan). No
+        # analysis.json is written, so the next run tries this paper again.
+        return {"status": "error", "folder": folder_name, "reason": f"Could not read PDF: {e}"}
     if len(text) < 100:
-        result = {
+        save_result(output_path, {
             "error": "Extracted text too short — likely a scanned PDF",
             "filename": filename,
             "extracted_chars": len(text),
-        }
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        })
         return {"status": "too_short", "folder": folder_name, "chars": len(text)}
 
-    # Call LLM
-    result = call_llm(text, filename)
+    return {"status": "ready", "folder": folder_name, "filename": filename,
+            "output_path": output_path, "text": text, "pdf_sha256": pdf_sha256,
+            "text_sha256": hashlib.sha256(text.encode("utf-8")).hexdigest()}
+
+
+# Zotero often holds the same paper in several folders. Maps the sha256 of
+# extracted text to an analysis.json already made for it (built in main and
+# extended as papers finish), so duplicates are copied instead of re-sent.
+dedup_index = {}
+
 
-    # Save result
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+def build_dedup_index(analysis_paths: list):
+    def read_hash(path):
+        try:
+            with open(path, "rb") as f:
+                result = json_loads(f.read())
+            if "error" not in result:
+                return result["_meta"]["text_sha256"], path
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # unreadable, or written before text hashes were recorded
+        return None
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for found in pool.map(read_hash, analysis_paths):
+            if found:
+                dedup_index.setdefault(*found)
+
+
+def copy_duplicate(item: dict) -> bool:
+    """If this paper's text was already analyzed, save a copy of that analysis."""
+    source_path = dedup_index.get(item["text_sha256"])
+    if source_path is None:
+        return False
+    try:
+        with open(source_path, "rb") as f:
+            result = json_loads(f.read())
+    except (OSError, ValueError):
+        return False
+
+    source_folder = os.path.basename(os.path.dirname(source_path))
+    meta = result.setdefault("_meta", {})
+    meta.update(input_tokens=0, cached_input_tokens=0, output_tokens=0,  # no API call made
+                source_folder=source_folder, pdf_sha256=item["pdf_sha256"])
+    try:
+        save_result(item["output_path"], result)
+    except (TypeError, ValueError):
+        return False  # analyze this copy instead
+    item["status"] = "duplicate"
+    item["source_folder"] = source_folder
+    return True
+
+
+def process_batch(folder_paths: list) -> list:
+    """Process Zotero storage folders, sharing one LLM call among their papers.
+
+    Returns one status dict per folder, in the same order.
+    """
+    statuses = [prepare_one(folder) for folder in folder_paths]
+    ready = [s for s in statuses if s["status"] == "ready" and not copy_duplicate(s)]
+
+    if len(ready) == 1:
+        results = [call_llm(ready[0]["text"], ready[0]["filename"])]
+    elif ready:
+        results = call_llm_batch([(s["filename"], s["text"]) for s in ready])
+    else:
+        results = []
+
+    for item, result in zip(ready, results):
+        if "_meta" in result:
+            result["_meta"]["pdf_sha256"] = item["pdf_sha256"]
+            result["_meta"]["text_sha256"] = item["text_sha256"]
+        try:
+            save_result(item["output_path"], result)
+        except (TypeError, ValueError) as e:
+            # e.g. a lone surrogate in the reply; nothing is written, so the
+            # next run retries this paper
+            item["status"] = "error"
+            item["reason"] = f"Could not save the analysis: {e}"
+            continue
+        item["status"] = "error" if "error" in result else "success"
+        if item["status"] == "success":
+            dedup_index.setdefault(item["text_sha256"], item["output_path"])
+
+    for item in statuses:  # drop the per-paper working data
+        for key in ("output_path", "text", "pdf_sha256", "text_sha256"):
+            item.pop(key, None)
+    return statuses
 
-    status = "error" if "error" in result else "success"
-    return {"status": status, "folder": folder_name, "filename": filename}
+
+def process_one(folder_path: str) -> dict:
+    """Process one Zotero storage folder."""
+    return process_batch([folder_path])[0]
 
 
 # ──────────────────── Main ────────────────────
 
 def main():
+    global extract_pool
     parser = argparse.ArgumentParser(description="Batch analyze Zotero library")
     parser.add_argument("--dry-run", action="store_true", help="Count only, no API calls")
     parser.add_argument("--limit", type=int, default=0, help="Max papers to process (0=all)")
     parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="Papers sent per LLM call (1=one request per paper)")
     parser.add_argument("--folder", type=str, default="", help="Process only this folder")
     args = parser.parse_args()
 
@@ -278,16 +690,18 @@ def main():
     if args.folder:
         folders = [os.path.join(ZOTERO_STORAGE, args.folder)]
     else:
-        folders = sorted([
-            os.path.join(ZOTERO_STORAGE, d)
-            for d in os.listdir(ZOTERO_STORAGE)
-            if os.path.isdir(os.path.join(ZOTERO_STORAGE, d))
-        ])
+        with os.scandir(ZOTERO_STORAGE) as it:
+            folders = sorted(e.path for e in it if e.is_dir())
+
+    # Scan every folder once (in parallel; listing many small dirs is I/O-bound)
+    with ThreadPoolExecutor(max_workers=16) as scan_pool:
+        entries = list(scan_pool.map(scan_folder, folders))
+    pdf_names = {f: os.path.basename(pdf) for f, pdf, _ in entries if pdf}
 
     # Stats
     total = len(folders)
-    has_pdf = sum(1 for f in folders if glob.glob(os.path.join(f, "*.pdf")))
-    already_done = sum(1 for f in folders if os.path.exists(os.path.join(f, OUTPUT_FILENAME)))
+    has_pdf = len(pdf_names)
+    already_done = sum(1 for _, _, done in entries if done)
     to_process = has_pdf - already_done
 
     print(f"📊 Summary:")
@@ -306,51 +720,82 @@ def main():
         return
 
     limit = args.limit if args.limit > 0 else to_process
-    print(f"🚀 Starting (limit={limit}, rate_limit_delay={RATE_LIMIT_DELAY}s)")
+    print(f"🚀 Starting (limit={limit}, concurrency={args.concurrency}, "
+          f"batch_size={args.batch_size}, rate_limit_delay={RATE_LIMIT_DELAY}s)")
     print()
 
-    stats = {"success": 0, "skipped": 0, "no_pdf": 0, "too_short": 0, "error": 0}
+    stats = {"success": 0, "duplicate": 0, "skipped": 0, "no_pdf": 0, "too_short": 0, "error": 0}
     start_time = time.time()
 
-    pending_folders = [
-        f for f in folders
-        if glob.glob(os.path.join(f, "*.pdf"))
-        and not os.path.exists(os.path.join(f, OUTPUT_FILENAME))
-    ][:limit]
-
-    for i, folder in enumerate(pending_folders, 1):
-        folder_name = os.path.basename(folder)
-        pdfs = glob.glob(os.path.join(folder, "*.pdf"))
-        pdf_name = os.path.basename(pdfs[0]) if pdfs else "?"
-
-        elapsed = time.time() - start_time
-        rate = i / elapsed if elapsed > 0 else 0
-        eta = (len(pending_folders) - i) / rate if rate > 0 else 0
+    build_dedup_index([os.path.join(f, OUTPUT_FILENAME) for f, _, done in entries if done])
 
-        print(f"[{i}/{len(pending_folders)}] {pdf_name[:70]}...")
+    pending_folders = [f for f, pdf, done in entries if pdf and not done][:limit]
 
-        result = process_one(folder)
-        stats[result["status"]] = stats.get(result["status"], 0) + 1
+    batch_size = max(1, args.batch_size)
+    batches = [pending_folders[j:j + batch_size]
+               for j in range(0, len(pending_folders), batch_size)]
 
-        if result["status"] == "success":
-            print(f"  ✅ Done")
-        elif result["status"] == "error":
-            print(f"  ❌ Failed")
-        elif result["status"] == "too_short":
-            print(f"  ⚠️ Text too short ({result.get('chars', '?')} chars) — likely scanned PDF")
-
-        if i % 10 == 0:
-            print(f"\n📈 Progress: {i}/{len(pending_folders)} | "
-                  f"success={stats['success']} error={stats['error']} short={stats['too_short']} | "
-                  f"ETA: {eta/60:.1f} min\n")
-
-        time.sleep(RATE_LIMIT_DELAY)
+    size_connection_pool(max(1, args.concurrency))
+    start_writer()
+    # "spawn", not Linux's default fork: the pool starts its workers lazily from a
+    # worker thread, and forking a multi-threaded process can deadlock the child
+    extract_pool = ProcessPoolExecutor(max_workers=min(max(1, args.concurrency), os.cpu_count() or 1),
+                                       mp_context=multiprocessing.get_context("spawn"))
+    pool = ThreadPoolExecutor(max_workers=max(1, args.concurrency))
+    futures = {pool.submit(process_batch, batch): batch for batch in batches}
+    reported = {}  # folder → status counted in stats
+    i = 0
+    try:
+        for future in as_completed(futures):
+            for folder, result in zip(futures[future], future.result()):
+                i += 1
+                reported[folder] = result["status"]
+                pdf_name = pdf_names.get(folder, "?")
+
+                stats[result["status"]] = stats.get(result["status"], 0) + 1
+
+                elapsed = time.time() - start_time
+                rate = i / elapsed if elapsed > 0 else 0
+                eta = (len(pending_folders) - i) / rate if rate > 0 else 0
+
+                print(f"[{i}/{len(pending_folders)}] {pdf_name[:70]}...")
+                if result["status"] == "success":
+                    print(f"  ✅ Done")
+                elif result["status"] == "duplicate":
+                    print(f"  ♻️ Same text as {result['source_folder']} — copied its analysis")
+                elif result["status"] == "error":
+                    print(f"  ❌ Failed" + (f": {result['reason']}" if "reason" in result else ""))
+                elif result["status"] == "too_short":
+                    print(f"  ⚠️ Text too short ({result.get('chars', '?')} chars) — likely scanned PDF")
+
+                if i % 10 == 0:
+                    print(f"\n📈 Progress: {i}/{len(pending_folders)} | "
+                          f"success={stats['success']} error={stats['error']} short={stats['too_short']} | "
+                          f"ETA: {eta/60:.1f} min\n")
+    except KeyboardInterrupt:
+        print("\n⏹ Interrupted — finishing papers already in progress (Ctrl-C again to abort)")
+        raise
+    finally:
+        # Also runs on Ctrl-C or a worker error: queued papers are cancelled, but
+        # in-flight ones run to completion (their LLM calls are already paid for),
+        # and only then is the writer drained, so every finished result is saved.
+        pool.shutdown(cancel_futures=True)
+        extract_pool.shutdown(cancel_futures=True)
+        write_queue.join()
+
+    # Results the writer failed to save were reported as done; count them as failed
+    for output_path in write_failures:
+        status = reported.pop(os.path.dirname(output_path), None)
+        if status is not None and status != "error":
+            stats[status] -= 1
+            stats["error"] += 1
 
     total_time = time.time() - start_time
     print(f"\n{'='*50}")
     print(f"🏁 Done!")
     print(f"   Time: {total_time/60:.1f} min")
     print(f"   Success: {stats['success']}")
+    print(f"   Duplicates copied: {stats['duplicate']}")
     print(f"   Skipped: {stats['skipped']}")
     print(f"   No PDF: {stats['no_pdf']}")
     print(f"   Too short: {stats['too_short']}")
@@ -4,14 +4,34 @@ Aggregate all analysis.json files from Zotero storage.
 Outputs a statistics report and saves summary.json.
 
 Run after analyze.py has completed (or partially completed).
+Re-runs only parse analysis.json files that changed since the last run
+(tracked in summary_state.json; delete it to force a full rescan).
 """
 
 import json
 import os
+import sys
 from collections import Counter, defaultdict
-from pathlib import Path
+from itertools import chain
+from operator import attrgetter
+
+try:
+    import orjson  # optional: much faster JSON parsing/serialization
+except ImportError:
+    orjson = None
 
 STORAGE = os.path.expanduser("~/Zotero/storage")
+STATE_PATH = os.path.join(os.path.dirname(__file__), "summary_state.json")
+STATE_VERSION = 1   # bump when Analysis fields or normalization change
+
+CAT_LABELS = {
+    "A": "Traditional methods in domain",
+    "B": "Data-driven methods (general background)",
+    "C": "Data-driven methods in domain",
+    "D": "Solutions to core challenge (any domain)",
+    "E": "Solutions to core challenge in domain (core)",
+    "F": "Other / Unrelated",
+}
 
 
 def normalize_category(cat):
@@ -24,30 +44,113 @@ def normalize_category(cat):
     return "Unknown"
 
 
+class Analysis:
+    """
+    The fields of one analysis.json that the report uses, normalized.
+
+    Long free-text fields (core_contribution, review_angle, ...) are dropped
+    as soon as a file is parsed, and __slots__ keeps each record much smaller
+    than the equivalent dict.
+    """
+
+    __slots__ = ("folder", "title", "year", "language", "primary_category",
+                 "secondary_categories", "relevance_score", "ml_methods", "core_technique")
+
+    def __init__(self, data, folder):
+        self.folder = folder
+        self.title = data.get("title") or "?"
+        self.year = data.get("year")
+        self.language = data.get("language", "Unknown")
+        self.primary_category = normalize_category(data.get("primary_category"))
+        self.secondary_categories = [
+            normalize_category(c) for c in data.get("secondary_categories") or []
+        ]
+        rs = data.get("relevance_score")
+        if rs is None:
+            self.relevance_score = "?"
+        else:
+            try:
+                self.relevance_score = int(rs)
+            except (ValueError, TypeError):
+                self.relevance_score = 0
+        self.ml_methods = data.get("ml_methods") or []
+        self.core_technique = data.get("core_technique") or []
+
+    def to_state(self):
+        return [getattr(self, k) for k in self.__slots__[1:]]
+
+    @classmethod
+    def from_state(cls, values, folder):
+        record = cls.__new__(cls)
+        record.folder = folder
+        for k, v in zip(cls.__slots__[1:], values):
+            setattr(record, k, v)
+        return record
+
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_bytes(obj, indent: bool = False) -> bytes:
+    """UTF-8 JSON (non-ASCII kept as-is), pretty-printed if indent."""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def section_header(title):
+    return [f"\n{'─'*60}", title, f"{'─'*60}"]
+
+
+def write_lines(lines):
+    """Print a whole report section with a single write."""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def load_state():
+    """Records from the previous run: {folder: [mtime_ns, size, Analysis state]}."""
+    try:
+        with open(STATE_PATH, "rb") as f:
+            state = json_loads(f.read())
+        if state.get("version") == STATE_VERSION:
+            return state["records"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass  # no usable state — everything gets parsed
+    return {}
+
+
 def load_all():
+    previous = load_state()
+    records = {}
     results = []
     errors = []
     for folder in sorted(os.listdir(STORAGE)):
-        fp = Path(STORAGE) / folder / "analysis.json"
-        if fp.exists():
+        fp = os.path.join(STORAGE, folder, "analysis.json")
+        try:
+            st = os.stat(fp)
+        except OSError:
+            continue  # no analysis.json (or not a folder)
+
+        entry = previous.get(folder)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            record = Analysis.from_state(entry[2], folder)
+        else:
             try:
-                with open(fp, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                data["_folder"] = folder
-                data["primary_category"] = normalize_category(data.get("primary_category"))
-                if "secondary_categories" in data:
-                    data["secondary_categories"] = [
-                        normalize_category(c) for c in data.get("secondary_categories", [])
-                    ]
-                rs = data.get("relevance_score")
-                if rs is not None:
-                    try:
-                        data["relevance_score"] = int(rs)
-                    except (ValueError, TypeError):
-                        data["relevance_score"] = 0
-                results.append(data)
+                with open(fp, "rb") as f:
+                    record = Analysis(json_loads(f.read()), folder)
             except Exception as e:
                 errors.append((folder, str(e)))
+                continue
+        results.append(record)
+        records[folder] = [st.st_mtime_ns, st.st_size, record.to_state()]
+
+    try:
+        with open(STATE_PATH, "wb") as f:
+            f.write(json_bytes({"version": STATE_VERSION, "records": records}))
+    except OSError:
+        pass  # the cache is only an optimization
     return results, errors
 
 
@@ -65,156 +168,103 @@ def main():
         if len(errors) > 10:
             print(f"  ... and {len(errors)-10} more")
 
+    # Count column by column: map/attrgetter/chain feed Counter entirely in C,
+    # the stdlib equivalent of a dataframe value_counts()
+    cats = list(map(attrgetter("primary_category"), results))
+    scores = list(map(attrgetter("relevance_score"), results))
+    primary = Counter(cats)
+    rel = Counter(scores)
+    cross = defaultdict(Counter)
+    for (cat, score), count in Counter(zip(cats, scores)).items():
+        cross[cat][score] = count
+    secondary = Counter(chain.from_iterable(map(attrgetter("secondary_categories"), results)))
+    ml = Counter(map(str.strip, filter(None, chain.from_iterable(
+        map(attrgetter("ml_methods"), results)))))
+    techniques = Counter(map(str.strip, filter(None, chain.from_iterable(
+        map(attrgetter("core_technique"), results)))))
+    years = Counter(filter(None, map(attrgetter("year"), results)))
+    lang = Counter(map(attrgetter("language"), results))
+    core = [r for r, cat, score in zip(results, cats, scores)
+            if cat == "E" and score != "?" and score >= 4]
+
     # === 1. Primary Category Distribution ===
-    primary = Counter()
-    for r in results:
-        cat = r.get("primary_category", "Unknown")
-        primary[cat] = primary.get(cat, 0) + 1
-
-    print(f"\n{'─'*60}")
-    print(f"📂 1. Primary Category Distribution")
-    print(f"{'─'*60}")
-    cat_labels = {
-        "A": "Traditional methods in domain",
-        "B": "Data-driven methods (general background)",
-        "C": "Data-driven methods in domain",
-        "D": "Solutions to core challenge (any domain)",
-        "E": "Solutions to core challenge in domain (core)",
-        "F": "Other / Unrelated",
-    }
+    lines = section_header("📂 1. Primary Category Distribution")
     for cat in ["A", "B", "C", "D", "E", "F"]:
         count = primary.get(cat, 0)
         pct = count / len(results) * 100 if results else 0
         bar = "█" * int(pct / 2)
-        label = cat_labels.get(cat, "")
-        print(f"  {cat} ({label}): {count:>4} ({pct:5.1f}%) {bar}")
+        lines.append(f"  {cat} ({CAT_LABELS[cat]}): {count:>4} ({pct:5.1f}%) {bar}")
     for cat, count in primary.items():
-        if cat not in ["A", "B", "C", "D", "E", "F"]:
+        if cat not in CAT_LABELS:
             pct = count / len(results) * 100
-            print(f"  {cat}: {count:>4} ({pct:5.1f}%)")
+            lines.append(f"  {cat}: {count:>4} ({pct:5.1f}%)")
+    write_lines(lines)
 
     # === 2. Relevance Score Distribution ===
-    rel = Counter()
-    for r in results:
-        score = r.get("relevance_score", "?")
-        rel[score] = rel.get(score, 0) + 1
-
-    print(f"\n{'─'*60}")
-    print(f"📈 2. Relevance Score Distribution (1–5)")
-    print(f"{'─'*60}")
+    lines = section_header("📈 2. Relevance Score Distribution (1–5)")
     for score in sorted(rel.keys(), key=lambda x: (isinstance(x, str), x)):
         count = rel[score]
         pct = count / len(results) * 100
         bar = "█" * int(pct / 2)
-        print(f"  {score}: {count:>4} ({pct:5.1f}%) {bar}")
+        lines.append(f"  {score}: {count:>4} ({pct:5.1f}%) {bar}")
+    write_lines(lines)
 
     # === 3. Secondary Category Distribution ===
-    secondary = Counter()
-    for r in results:
-        for cat in r.get("secondary_categories", []):
-            secondary[cat] += 1
-
-    print(f"\n{'─'*60}")
-    print(f"📂 3. Secondary Category Distribution (multi-select)")
-    print(f"{'─'*60}")
+    lines = section_header("📂 3. Secondary Category Distribution (multi-select)")
     for cat in ["A", "B", "C", "D", "E", "F"]:
-        count = secondary.get(cat, 0)
-        print(f"  {cat}: {count:>4}")
+        lines.append(f"  {cat}: {secondary.get(cat, 0):>4}")
+    write_lines(lines)
 
     # === 4. Top ML Methods ===
-    ml = Counter()
-    for r in results:
-        for m in r.get("ml_methods", []):
-            if m:
-                ml[m.strip()] += 1
-
-    print(f"\n{'─'*60}")
-    print(f"🤖 4. Top ML Methods (Top 20)")
-    print(f"{'─'*60}")
+    lines = section_header("🤖 4. Top ML Methods (Top 20)")
     for method, count in ml.most_common(20):
-        print(f"  {method}: {count}")
+        lines.append(f"  {method}: {count}")
+    write_lines(lines)
 
     # === 5. Top Core Techniques ===
-    techniques = Counter()
-    for r in results:
-        for t in r.get("core_technique", []):
-            if t:
-                techniques[t.strip()] += 1
-
-    print(f"\n{'─'*60}")
-    print(f"🔧 5. Top Core Techniques (Top 20)")
-    print(f"{'─'*60}")
+    lines = section_header("🔧 5. Top Core Techniques (Top 20)")
     for technique, count in techniques.most_common(20):
-        print(f"  {technique}: {count}")
+        lines.append(f"  {technique}: {count}")
+    write_lines(lines)
 
     # === 6. Year Distribution ===
-    years = Counter()
-    for r in results:
-        y = r.get("year")
-        if y:
-            years[y] += 1
-
-    print(f"\n{'─'*60}")
-    print(f"📅 6. Year Distribution")
-    print(f"{'─'*60}")
+    lines = section_header("📅 6. Year Distribution")
     for y in sorted(years.keys()):
         count = years[y]
         bar = "█" * int(count / 2)
-        print(f"  {y}: {count:>3} {bar}")
+        lines.append(f"  {y}: {count:>3} {bar}")
+    write_lines(lines)
 
     # === 7. Language Distribution ===
-    lang = Counter()
-    for r in results:
-        l = r.get("language", "Unknown")
-        lang[l] += 1
-
-    print(f"\n{'─'*60}")
-    print(f"🌐 7. Language Distribution")
-    print(f"{'─'*60}")
+    lines = section_header("🌐 7. Language Distribution")
     for l, count in lang.most_common():
-        print(f"  {l}: {count}")
+        lines.append(f"  {l}: {count}")
+    write_lines(lines)
 
     # === 8. Category × Relevance Crosstab ===
-    print(f"\n{'─'*60}")
-    print(f"📊 8. Category × Relevance Score Crosstab")
-    print(f"{'─'*60}")
-    cross = defaultdict(Counter)
-    for r in results:
-        cat = r.get("primary_category", "?")
-        score = r.get("relevance_score", "?")
-        cross[cat][score] += 1
-
-    print(f"  {'Cat':<6}", end="")
-    for s in [1, 2, 3, 4, 5]:
-        print(f"  {s:>4}", end="")
-    print(f"  {'Total':>6}")
+    lines = section_header("📊 8. Category × Relevance Score Crosstab")
+    lines.append(f"  {'Cat':<6}" + "".join(f"  {s:>4}" for s in [1, 2, 3, 4, 5]) + f"  {'Total':>6}")
     for cat in ["A", "B", "C", "D", "E", "F"]:
         row = cross.get(cat, {})
         total = sum(row.values())
-        print(f"  {cat:<6}", end="")
-        for s in [1, 2, 3, 4, 5]:
-            print(f"  {row.get(s,0):>4}", end="")
-        print(f"  {total:>6}")
+        lines.append(f"  {cat:<6}" + "".join(f"  {row.get(s,0):>4}" for s in [1, 2, 3, 4, 5])
+                     + f"  {total:>6}")
+    write_lines(lines)
 
     # === 9. Core Papers (Category E + score ≥ 4) ===
-    core = [r for r in results
-            if r.get("primary_category") == "E" and r.get("relevance_score", 0) >= 4]
-    core.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+    core.sort(key=lambda x: x.relevance_score, reverse=True)
 
-    print(f"\n{'─'*60}")
-    print(f"⭐ 9. Core Papers (Category E + score ≥ 4): {len(core)} papers")
-    print(f"{'─'*60}")
+    lines = section_header(f"⭐ 9. Core Papers (Category E + score ≥ 4): {len(core)} papers")
     for r in core[:20]:
-        title = r.get("title", "?")[:60]
-        year = r.get("year", "?")
-        score = r.get("relevance_score", "?")
-        methods = ", ".join(r.get("ml_methods", [])[:3])
-        print(f"  [{score}] {title}... ({year})")
+        year = r.year if r.year is not None else "?"
+        methods = ", ".join(r.ml_methods[:3])
+        lines.append(f"  [{r.relevance_score}] {r.title[:60]}... ({year})")
         if methods:
-            print(f"      Methods: {methods}")
+            lines.append(f"      Methods: {methods}")
 
     if len(core) > 20:
-        print(f"  ... and {len(core)-20} more")
+        lines.append(f"  ... and {len(core)-20} more")
+    write_lines(lines)
 
     # === Save summary.json ===
     summary = {
@@ -230,8 +280,8 @@ def main():
         "language_distribution": dict(lang),
     }
     out_path = os.path.join(os.path.dirname(__file__), "summary.json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(summary, f, ensure_ascii=False, indent=2)
+    with open(out_path, "wb", buffering=65536) as f:
+        f.write(json_bytes(summary, indent=True))
     print(f"\n✅ Summary saved to: {out_path}")
 
 
@@ -9,24 +9,59 @@ and generates:
   - background_papers.json: representative A/B/C papers for background chapters
 
 Before running:
-  1. Update normalize_technique() with your domain's terminology
+  1. Update TECHNIQUE_KEYWORDS (used by normalize_technique()) with your domain's terminology
   2. Run after analyze.py and summarize.py have completed
 """
 
+import heapq
 import json
 import os
+import re
 from collections import Counter, defaultdict
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
+
+try:
+    import orjson  # optional: much faster JSON parsing/serialization
+except ImportError:
+    orjson = None
 
 STORAGE = os.path.expanduser("~/Zotero/storage")
 OUT_DIR = os.path.dirname(__file__)
+EXPORT_INDENT = True   # pretty-print the exported JSON; False writes compact JSON
+                       # (smaller, and much faster to write when orjson isn't installed)
+
+# analysis.json fields used by the outline and exports; everything else (long
+# notes, extra LLM output, _meta) is dropped as soon as a file is parsed
+KEEP_FIELDS = (
+    "title", "title_zh", "year", "primary_category", "relevance_score",
+    "secondary_categories", "ml_methods", "core_technique", "domain_specific_material",
+    "core_contribution", "core_conclusion", "review_angle", "keywords_zh",
+)
 
 
 def normalize_category(cat):
     if not cat or not isinstance(cat, str):
         return "Unknown"
-    c = cat.strip()[0].upper()
-    return c if c in "ABCDEF" else "Unknown"
+    c = cat.strip()[:1].upper()
+    return c if c and c in "ABCDEF" else "Unknown"
+
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_bytes(obj, indent: bool = False) -> bytes:
+    """UTF-8 JSON (non-ASCII kept as-is), pretty-printed if indent."""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    # No indent lets json use its C encoder; compact separators match orjson
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
 
 def safe_int(v, default=0):
@@ -36,28 +71,65 @@ def safe_int(v, default=0):
         return default
 
 
+def str_items(v):
+    """The string entries of a list field (LLM output may hold nulls or a bare string)."""
+    if isinstance(v, str):
+        return [v]
+    if not isinstance(v, list):
+        return []
+    return [x for x in v if isinstance(x, str)]
+
+
+def load_one(entry):
+    """Load and normalize one folder's analysis.json; None if missing or unreadable."""
+    fp = os.path.join(entry.path, "analysis.json")
+    try:
+        # Open directly instead of probing with exists() first
+        with open(fp, "rb") as f:
+            raw = json_loads(f.read())
+    except (OSError, ValueError):
+        return None  # no analysis.json yet, or not valid JSON
+    if not isinstance(raw, dict):
+        return None
+
+    # Everything below tolerates malformed values, so one odd field never
+    # drops a paper from the outline and exports
+    data = {k: raw[k] for k in KEEP_FIELDS if k in raw}
+    data["_folder"] = entry.name
+    data["primary_category"] = normalize_category(data.get("primary_category"))
+    data["relevance_score"] = safe_int(data.get("relevance_score"))
+    data["year"] = safe_int(data.get("year"))
+    data["_sort_key"] = (data["relevance_score"], data["year"])  # ranking order
+    if "secondary_categories" in data:
+        secondary = data["secondary_categories"]
+        data["secondary_categories"] = [
+            normalize_category(c) for c in (secondary if isinstance(secondary, list) else [])
+        ]
+    # Normalized once here and reused for grouping, trends and export, so main()
+    # never calls normalize_technique(); a null core_technique counts as untagged
+    data["_norm_techniques"] = [
+        normalize_technique(t) for t in str_items(data.get("core_technique"))
+    ]
+    # Display fields for the outline, so rendering is plain lookups
+    title = str(data.get("title") or "?")
+    data["_title_short"] = title[:70]
+    data["_title_shorter"] = title[:65]
+    data["_methods_str"] = ", ".join(str_items(data.get("ml_methods"))[:3])
+    data["_contribution_short"] = str(data.get("core_contribution") or "")[:80]
+    data["_angle_short"] = str(data.get("review_angle") or "")[:80]
+    return data
+
+
 def load_all():
-    results = []
-    for folder in sorted(os.listdir(STORAGE)):
-        fp = Path(STORAGE) / folder / "analysis.json"
-        if fp.exists():
-            try:
-                with open(fp, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                data["_folder"] = folder
-                data["primary_category"] = normalize_category(data.get("primary_category"))
-                data["relevance_score"] = safe_int(data.get("relevance_score"))
-                data["year"] = safe_int(data.get("year"))
-                if "secondary_categories" in data:
-                    data["secondary_categories"] = [
-                        normalize_category(c) for c in data.get("secondary_categories", [])
-                    ]
-                results.append(data)
-            except Exception:
-                pass
-    return results
+    # scandir's cached entry type skips stray files (.DS_Store, ...) without a stat;
+    # files are independent and reading them is I/O-bound, so load them in parallel
+    with os.scandir(STORAGE) as it:
+        folders = sorted((e for e in it if e.is_dir()), key=lambda e: e.name)
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as ex:
+        return [r for r in ex.map(load_one, folders) if r is not None]
 
 
+@lru_cache(maxsize=None)
 def normalize_method(m):
     """
     Merge synonymous ML method names.
@@ -92,75 +164,67 @@ def normalize_method(m):
     return mapping.get(m, m)
 
 
-def normalize_technique(s):
-    """
-    Merge synonymous technique/strategy names using keyword matching.
-
-    IMPORTANT: Update this function for your review topic.
-    Replace the keyword lists below with the terminology used in your domain.
-
-    Each block should:
-    1. Define a canonical name (the string returned)
-    2. List keywords that map to that canonical name
-    """
-    s = s.strip()
-    sl = s.lower()
-
+# Technique buckets for normalize_technique(). Buckets are checked in order:
+# the first one with a keyword anywhere in the lowercased string wins.
+#
+# IMPORTANT: Update these for your review topic.
+# Replace the keyword lists below with the terminology used in your domain.
+# Each entry is (canonical name returned, [lowercase keywords that map to it]).
+TECHNIQUE_KEYWORDS = [
     # ── Example: Multi-fidelity data fusion ──
-    if any(kw in sl for kw in ["multi-fidelity", "multifidelity", "multi fidelity",
-                                 "dual fidelity", "bi-fidelity"]):
-        return "Multi-Fidelity Data Fusion"
-
+    ("Multi-Fidelity Data Fusion", ["multi-fidelity", "multifidelity", "multi fidelity",
+                                    "dual fidelity", "bi-fidelity"]),
     # ── Example: Transfer learning ──
-    if any(kw in sl for kw in ["transfer learn", "fine-tun", "fine tun"]):
-        return "Transfer Learning"
-
+    ("Transfer Learning", ["transfer learn", "fine-tun", "fine tun"]),
     # ── Example: Physics-informed methods ──
-    if any(kw in sl for kw in ["physics-inform", "physics inform", "pinn",
-                                 "physics-guided", "physics constrain"]):
-        return "Physics-Informed Methods / PINN"
-
+    ("Physics-Informed Methods / PINN", ["physics-inform", "physics inform", "pinn",
+                                         "physics-guided", "physics constrain"]),
     # ── Example: Surrogate modeling ──
-    if any(kw in sl for kw in ["surrogate", "emulat", "metamodel"]):
-        return "Surrogate Modeling"
-
+    ("Surrogate Modeling", ["surrogate", "emulat", "metamodel"]),
     # ── Example: Data augmentation ──
-    if any(kw in sl for kw in ["data augment"]):
-        return "Data Augmentation"
-
+    ("Data Augmentation", ["data augment"]),
     # ── Example: Virtual sample generation ──
-    if any(kw in sl for kw in ["virtual sample", "synthetic sample", "synthetic data"]):
-        return "Virtual Sample Generation"
-
+    ("Virtual Sample Generation", ["virtual sample", "synthetic sample", "synthetic data"]),
     # ── Example: Active learning / adaptive sampling ──
-    if any(kw in sl for kw in ["active learn", "adaptive sampling", "adaptive sample"]):
-        return "Active Learning / Adaptive Sampling"
-
+    ("Active Learning / Adaptive Sampling", ["active learn", "adaptive sampling",
+                                             "adaptive sample"]),
     # ── Example: Few-shot / small-data learning ──
-    if any(kw in sl for kw in ["few-shot", "few shot", "small sample", "small data",
-                                 "low-data", "low data"]):
-        return "Few-Shot / Small-Data Learning"
-
+    ("Few-Shot / Small-Data Learning", ["few-shot", "few shot", "small sample", "small data",
+                                        "low-data", "low data"]),
     # ── Example: Sparse methods / compressed sensing ──
-    if any(kw in sl for kw in ["sparse", "compress", "compressive"]):
-        return "Sparse Methods / Compressed Sensing"
-
+    ("Sparse Methods / Compressed Sensing", ["sparse", "compress", "compressive"]),
     # ── Example: Generative models ──
-    if any(kw in sl for kw in ["gan", "generative adversarial", "variational autoencod",
-                                 "diffusion model", "vae"]):
-        return "Generative Models (GAN/VAE/Diffusion)"
-
+    ("Generative Models (GAN/VAE/Diffusion)", ["gan", "generative adversarial",
+                                               "variational autoencod", "diffusion model", "vae"]),
     # ── Example: Multi-task learning ──
-    if any(kw in sl for kw in ["multi-task", "multitask"]):
-        return "Multi-Task Learning"
-
+    ("Multi-Task Learning", ["multi-task", "multitask"]),
     # ── Example: Uncertainty quantification ──
-    if any(kw in sl for kw in ["uncertainty", "bayesian", "probabilistic"]):
-        return "Uncertainty Quantification / Bayesian Methods"
-
+    ("Uncertainty Quantification / Bayesian Methods", ["uncertainty", "bayesian",
+                                                       "probabilistic"]),
     # ── Add more mappings for your domain ──
+]
+
+# All buckets in one compiled pattern. Alternative i is a lookahead for any of
+# bucket i's keywords, so matching at position 0 tries the buckets in order
+# and all the scanning runs inside the C regex engine.
+TECHNIQUE_RE = re.compile("|".join(
+    f"(?=.*?(?P<b{i}>{'|'.join(map(re.escape, keywords))}))"
+    for i, (_, keywords) in enumerate(TECHNIQUE_KEYWORDS)
+), re.DOTALL)
+
+
+@lru_cache(maxsize=None)
+def normalize_technique(s):
+    """
+    Merge synonymous technique/strategy names using keyword matching.
 
-    return s  # Return as-is if no match
+    IMPORTANT: Update TECHNIQUE_KEYWORDS above for your review topic.
+    """
+    s = s.strip()
+    m = TECHNIQUE_RE.match(s.lower())
+    if m is None or m.lastgroup is None:
+        return s  # Return as-is if no match
+    return TECHNIQUE_KEYWORDS[int(m.lastgroup[1:])][0]
 
 
 def main():
@@ -173,230 +237,221 @@ def main():
         by_cat[r["primary_category"]].append(r)
 
     # ── 2. Representative A/B/C papers ──
+    by_rank = itemgetter("_sort_key")  # (relevance_score, year), precomputed at load
     background_reps = {}
     limits = {"A": 15, "B": 8, "C": 15}
     for cat in ["A", "B", "C"]:
-        papers = by_cat.get(cat, [])
-        papers_sorted = sorted(papers, key=lambda x: (x["relevance_score"], x["year"]), reverse=True)
-        background_reps[cat] = papers_sorted[:limits[cat]]
+        # nlargest keeps sorted(..., reverse=True)[:k] order without a full sort
+        background_reps[cat] = heapq.nlargest(limits[cat], by_cat.get(cat, []), key=by_rank)
 
     # ── 3. D+E papers grouped by technique ──
     de_papers = by_cat.get("D", []) + by_cat.get("E", [])
 
+    # Technique groups, trend tallies and export rows are all built in one pass
     technique_groups = defaultdict(list)
-    for r in de_papers:
-        techniques = r.get("core_technique", [])
-        if not techniques:
-            technique_groups["Other / Untagged"].append(r)
-        else:
-            primary_technique = normalize_technique(techniques[0])
-            technique_groups[primary_technique].append(r)
-
-    # ── 4. Method × Year trends (D+E) ──
-    method_year = defaultdict(Counter)
-    for r in de_papers:
-        y = r.get("year", 0)
-        if y < 2010:
-            continue
-        for m in r.get("ml_methods", []):
-            nm = normalize_method(m)
-            method_year[nm][y] += 1
-
-    # ── 5. Technique × Year trends (D+E) ──
-    technique_year = defaultdict(Counter)
-    for r in de_papers:
-        y = r.get("year", 0)
-        if y < 2010:
-            continue
-        for t in r.get("core_technique", []):
-            nt = normalize_technique(t)
-            technique_year[nt][y] += 1
-
-    # ── 6. Generate outline ──
-    outline = []
-    outline.append("=" * 80)
-    outline.append("Review Outline: [YOUR REVIEW TITLE]")
-    outline.append("=" * 80)
-    outline.append("NOTE: Replace section titles and content guidance with your actual topic.\n")
-
-    # Chapter 1: Introduction
-    outline.append("─" * 80)
-    outline.append("Chapter 1: Introduction")
-    outline.append("─" * 80)
-    outline.append("Purpose: Background, motivation, scope")
-    outline.append("Suggested length: ~2 pages\n")
-    outline.append("1.1 Importance of [your domain] and key challenges")
-    outline.append("    → Cite A-category papers on limitations of traditional methods")
-    outline.append("1.2 Rise of data-driven methods")
-    outline.append("    → Cite B-category survey papers")
-    outline.append("1.3 The core tension: [your challenge]")
-    outline.append("    → Articulate the gap that this review addresses")
-    outline.append("1.4 Scope and organization\n")
-
-    # Chapter 2: Traditional methods
-    outline.append("─" * 80)
-    outline.append("Chapter 2: Traditional Methods and Their Limitations (Category A)")
-    outline.append("─" * 80)
-    outline.append("Purpose: Show why traditional approaches are insufficient")
-    outline.append("Suggested length: ~3 pages\n")
-    outline.append("2.1 [Traditional method type 1]")
-    outline.append("2.2 [Traditional method type 2]")
-    outline.append("2.3 Common limitations and bottlenecks\n")
-    outline.append("Representative papers (Category A, Top 15):")
-    for i, r in enumerate(background_reps.get("A", []), 1):
-        title = r.get("title", "?")[:70]
-        year = r.get("year", "?")
-        score = r.get("relevance_score", "?")
-        angle = r.get("review_angle", "")[:80]
-        outline.append(f"  {i:2d}. [{score}] {title} ({year})")
-        outline.append(f"      Folder: {r['_folder']}")
-        if angle:
-            outline.append(f"      Review angle: {angle}")
-
-    # Chapter 3: Data-driven background
-    outline.append("\n" + "─" * 80)
-    outline.append("Chapter 3: Data-Driven Methods in [Your Field] (Category B)")
-    outline.append("─" * 80)
-    outline.append("Purpose: Establish methodological background")
-    outline.append("Suggested length: ~2 pages\n")
-    outline.append("3.1 Overview of ML/DL development in [field]")
-    outline.append("3.2 Common methods (ANN, CNN, GP, RF, etc.)")
-    outline.append("3.3 Opportunities and challenges\n")
-    outline.append("Representative papers (Category B, Top 8):")
-    for i, r in enumerate(background_reps.get("B", []), 1):
-        title = r.get("title", "?")[:70]
-        year = r.get("year", "?")
-        score = r.get("relevance_score", "?")
-        outline.append(f"  {i:2d}. [{score}] {title} ({year})")
-        outline.append(f"      Folder: {r['_folder']}")
-
-    # Chapter 4: Domain adoption
-    outline.append("\n" + "─" * 80)
-    outline.append("Chapter 4: Data-Driven Methods in [Your Domain] (Category C)")
-    outline.append("─" * 80)
-    outline.append("Purpose: Show data-driven methods are established in your domain")
-    outline.append("Suggested length: ~3 pages\n")
-    outline.append("4.1 [Application area 1]")
-    outline.append("4.2 [Application area 2]")
-    outline.append("4.3 [Application area 3]")
-    outline.append("4.4 Persistent challenge: [your core problem]\n")
-    outline.append("Representative papers (Category C, Top 15):")
-    for i, r in enumerate(background_reps.get("C", []), 1):
-        title = r.get("title", "?")[:70]
-        year = r.get("year", "?")
-        score = r.get("relevance_score", "?")
-        methods = ", ".join(r.get("ml_methods", [])[:3])
-        outline.append(f"  {i:2d}. [{score}] {title} ({year})")
-        outline.append(f"      Folder: {r['_folder']}")
-        if methods:
-            outline.append(f"      Methods: {methods}")
-
-    # Chapter 5: Core strategies
-    outline.append("\n" + "─" * 80)
-    outline.append("Chapter 5: Strategies for [Your Core Challenge] (Categories D+E) ★★★")
-    outline.append("─" * 80)
-    outline.append("Purpose: Core contribution — systematically survey all relevant strategies")
-    outline.append("Suggested length: ~10–15 pages (largest chapter)\n")
-
-    sorted_techniques = sorted(technique_groups.items(), key=lambda x: len(x[1]), reverse=True)
-
-    section_num = 1
-    for technique, papers in sorted_techniques:
-        if len(papers) < 2:
-            continue
-        papers_sorted = sorted(papers, key=lambda x: (x["relevance_score"], x["year"]), reverse=True)
-        e_count = sum(1 for p in papers if p["primary_category"] == "E")
-        d_count = sum(1 for p in papers if p["primary_category"] == "D")
-
-        outline.append(f"\n5.{section_num} {technique} ({len(papers)} papers: E={e_count}, D={d_count})")
-        for i, r in enumerate(papers_sorted[:8], 1):
-            title = r.get("title", "?")[:65]
-            year = r.get("year", "?")
-            cat = r.get("primary_category", "?")
-            score = r.get("relevance_score", "?")
-            contribution = r.get("core_contribution", "")[:80]
-            outline.append(f"    {i}. [{cat}{score}] {title} ({year})")
-            outline.append(f"       Folder: {r['_folder']}")
-            if contribution:
-                outline.append(f"       Contribution: {contribution}")
-        if len(papers) > 8:
-            outline.append(f"    ... {len(papers)-8} more papers")
-
-        section_num += 1
-
-    small_techniques = [(s, p) for s, p in sorted_techniques if len(p) < 2 and len(p) > 0]
-    if small_techniques:
-        outline.append(f"\n5.{section_num} Other Methods (1 paper each)")
-        for technique, papers in small_techniques:
-            r = papers[0]
-            title = r.get("title", "?")[:65]
-            year = r.get("year", "?")
-            outline.append(f"    - {technique}: {title} ({year})")
-            outline.append(f"      Folder: {r['_folder']}")
-
-    # Chapter 6: Trends
-    outline.append("\n" + "─" * 80)
-    outline.append("Chapter 6: Trends and Future Directions")
-    outline.append("─" * 80)
-    outline.append("Purpose: Show temporal trends, identify future directions")
-    outline.append("Suggested length: ~2–3 pages\n")
-
-    outline.append("6.1 Method adoption trends (by year)")
-    top_methods = sorted(method_year.items(), key=lambda x: sum(x[1].values()), reverse=True)[:8]
-    for method, years in top_methods:
-        year_str = ", ".join(f"{y}:{c}" for y, c in sorted(years.items()) if y >= 2017)
-        outline.append(f"    {method}: {year_str}")
-
-    outline.append("")
-    outline.append("6.2 Strategy evolution trends (by year)")
-    top_techs = sorted(technique_year.items(), key=lambda x: sum(x[1].values()), reverse=True)[:8]
-    for tech, years in top_techs:
-        year_str = ", ".join(f"{y}:{c}" for y, c in sorted(years.items()) if y >= 2017)
-        outline.append(f"    {tech}: {year_str}")
-
-    outline.append("")
-    outline.append("6.3 Recommended future directions")
-    outline.append("    - Multi-strategy combinations")
-    outline.append("    - Foundation models / large language models in your domain")
-    outline.append("    - Standardized benchmark datasets")
-    outline.append("    - Uncertainty quantification and reliability")
-
-    # Chapter 7: Conclusions
-    outline.append("\n" + "─" * 80)
-    outline.append("Chapter 7: Conclusions")
-    outline.append("─" * 80)
-    outline.append("Suggested length: ~1 page")
-
-    # ── Write outline file ──
-    outline_text = "\n".join(outline)
-    outline_path = os.path.join(OUT_DIR, "review_outline.md")
-    with open(outline_path, "w", encoding="utf-8") as f:
-        f.write(outline_text)
-    print(f"✅ Outline saved: {outline_path}")
-
-    # ── Export D+E papers for writing ──
+    technique_cat_counts = defaultdict(Counter)  # technique → {"D": n, "E": n}
+    method_pairs = Counter()     # (method, year) → count
+    technique_pairs = Counter()  # (technique, year) → count
     de_export = []
+    de_export_keys = []  # (category, -score) per export row, kept out of the JSON
     for r in de_papers:
+        y = r["year"]
+        methods = r.get("ml_methods", [])
+        techniques = r["_norm_techniques"]
+        group = techniques[0] if techniques else "Other / Untagged"
+        technique_groups[group].append(r)
+        technique_cat_counts[group][r["primary_category"]] += 1
+        if y >= 2010:
+            method_pairs.update(zip(map(normalize_method, str_items(methods)), repeat(y)))
+            technique_pairs.update(zip(techniques, repeat(y)))
+        de_export_keys.append((r["primary_category"], -r["relevance_score"]))
         de_export.append({
             "folder": r["_folder"],
             "title": r.get("title", ""),
             "title_zh": r.get("title_zh", ""),
-            "year": r.get("year"),
+            "year": y,
             "primary_category": r.get("primary_category"),
             "relevance_score": r.get("relevance_score"),
-            "ml_methods": r.get("ml_methods", []),
-            "core_technique": [normalize_technique(t) for t in r.get("core_technique", [])],
+            "ml_methods": methods,
+            "core_technique": techniques,
             "domain_specific_material": r.get("domain_specific_material"),
             "core_contribution": r.get("core_contribution", ""),
             "core_conclusion": r.get("core_conclusion", ""),
             "review_angle": r.get("review_angle", ""),
             "keywords_zh": r.get("keywords_zh", []),
         })
-    de_export.sort(key=lambda x: (x["primary_category"], -x.get("relevance_score", 0)))
+
+    # Techniques with 2+ papers get their own Chapter 5 section (largest first);
+    # singletons are listed together under "Other Methods"
+    big_techniques = sorted(((t, p) for t, p in technique_groups.items() if len(p) >= 2),
+                            key=lambda x: len(x[1]), reverse=True)
+    small_techniques = [(t, p) for t, p in technique_groups.items() if len(p) == 1]
+
+    # ── 4. Method × Year trends (D+E) ──
+    method_year = defaultdict(Counter)
+    method_totals = Counter()   # papers per method over all years, for the top-8 pick
+    for (nm, y), c in method_pairs.items():
+        method_year[nm][y] = c
+        method_totals[nm] += c
+
+    # ── 5. Technique × Year trends (D+E) ──
+    technique_year = defaultdict(Counter)
+    technique_totals = Counter()
+    for (nt, y), c in technique_pairs.items():
+        technique_year[nt][y] = c
+        technique_totals[nt] += c
+
+    # ── 6. Generate outline ──
+    # Lines are streamed straight into a large write buffer instead of being
+    # collected in a list and joined at the end
+    outline_path = os.path.join(OUT_DIR, "review_outline.md")
+    with open(outline_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        w = f.write
+
+        def emit(line):
+            w(line)
+            w("\n")
+
+        emit("=" * 80)
+        emit("Review Outline: [YOUR REVIEW TITLE]")
+        emit("=" * 80)
+        emit("NOTE: Replace section titles and content guidance with your actual topic.\n")
+
+        # Chapter 1: Introduction
+        emit("─" * 80)
+        emit("Chapter 1: Introduction")
+        emit("─" * 80)
+        emit("Purpose: Background, motivation, scope")
+        emit("Suggested length: ~2 pages\n")
+        emit("1.1 Importance of [your domain] and key challenges")
+        emit("    → Cite A-category papers on limitations of traditional methods")
+        emit("1.2 Rise of data-driven methods")
+        emit("    → Cite B-category survey papers")
+        emit("1.3 The core tension: [your challenge]")
+        emit("    → Articulate the gap that this review addresses")
+        emit("1.4 Scope and organization\n")
+
+        # Chapter 2: Traditional methods
+        emit("─" * 80)
+        emit("Chapter 2: Traditional Methods and Their Limitations (Category A)")
+        emit("─" * 80)
+        emit("Purpose: Show why traditional approaches are insufficient")
+        emit("Suggested length: ~3 pages\n")
+        emit("2.1 [Traditional method type 1]")
+        emit("2.2 [Traditional method type 2]")
+        emit("2.3 Common limitations and bottlenecks\n")
+        emit("Representative papers (Category A, Top 15):")
+        for i, r in enumerate(background_reps.get("A", []), 1):
+            emit(f"  {i:2d}. [{r['relevance_score']}] {r['_title_short']} ({r['year']})")
+            emit(f"      Folder: {r['_folder']}")
+            if r["_angle_short"]:
+                emit(f"      Review angle: {r['_angle_short']}")
+
+        # Chapter 3: Data-driven background
+        emit("\n" + "─" * 80)
+        emit("Chapter 3: Data-Driven Methods in [Your Field] (Category B)")
+        emit("─" * 80)
+        emit("Purpose: Establish methodological background")
+        emit("Suggested length: ~2 pages\n")
+        emit("3.1 Overview of ML/DL development in [field]")
+        emit("3.2 Common methods (ANN, CNN, GP, RF, etc.)")
+        emit("3.3 Opportunities and challenges\n")
+        emit("Representative papers (Category B, Top 8):")
+        for i, r in enumerate(background_reps.get("B", []), 1):
+            emit(f"  {i:2d}. [{r['relevance_score']}] {r['_title_short']} ({r['year']})")
+            emit(f"      Folder: {r['_folder']}")
+
+        # Chapter 4: Domain adoption
+        emit("\n" + "─" * 80)
+        emit("Chapter 4: Data-Driven Methods in [Your Domain] (Category C)")
+        emit("─" * 80)
+        emit("Purpose: Show data-driven methods are established in your domain")
+        emit("Suggested length: ~3 pages\n")
+        emit("4.1 [Application area 1]")
+        emit("4.2 [Application area 2]")
+        emit("4.3 [Application area 3]")
+        emit("4.4 Persistent challenge: [your core problem]\n")
+        emit("Representative papers (Category C, Top 15):")
+        for i, r in enumerate(background_reps.get("C", []), 1):
+            emit(f"  {i:2d}. [{r['relevance_score']}] {r['_title_short']} ({r['year']})")
+            emit(f"      Folder: {r['_folder']}")
+            if r["_methods_str"]:
+                emit(f"      Methods: {r['_methods_str']}")
+
+        # Chapter 5: Core strategies
+        emit("\n" + "─" * 80)
+        emit("Chapter 5: Strategies for [Your Core Challenge] (Categories D+E) ★★★")
+        emit("─" * 80)
+        emit("Purpose: Core contribution — systematically survey all relevant strategies")
+        emit("Suggested length: ~10–15 pages (largest chapter)\n")
+
+        section_num = 1
+        for technique, papers in big_techniques:
+            top_papers = heapq.nlargest(8, papers, key=by_rank)
+            e_count = technique_cat_counts[technique]["E"]
+            d_count = technique_cat_counts[technique]["D"]
+
+            emit(f"\n5.{section_num} {technique} ({len(papers)} papers: E={e_count}, D={d_count})")
+            for i, r in enumerate(top_papers, 1):
+                emit(f"    {i}. [{r['primary_category']}{r['relevance_score']}] "
+                     f"{r['_title_shorter']} ({r['year']})")
+                emit(f"       Folder: {r['_folder']}")
+                if r["_contribution_short"]:
+                    emit(f"       Contribution: {r['_contribution_short']}")
+            if len(papers) > 8:
+                emit(f"    ... {len(papers)-8} more papers")
+
+            section_num += 1
+
+        if small_techniques:
+            emit(f"\n5.{section_num} Other Methods (1 paper each)")
+            for technique, papers in small_techniques:
+                r = papers[0]
+                emit(f"    - {technique}: {r['_title_shorter']} ({r['year']})")
+                emit(f"      Folder: {r['_folder']}")
+
+        # Chapter 6: Trends
+        emit("\n" + "─" * 80)
+        emit("Chapter 6: Trends and Future Directions")
+        emit("─" * 80)
+        emit("Purpose: Show temporal trends, identify future directions")
+        emit("Suggested length: ~2–3 pages\n")
+
+        emit("6.1 Method adoption trends (by year)")
+        for method, _ in method_totals.most_common(8):
+            years = method_year[method]
+            year_str = ", ".join(f"{y}:{c}" for y, c in sorted(years.items()) if y >= 2017)
+            emit(f"    {method}: {year_str}")
+
+        emit("")
+        emit("6.2 Strategy evolution trends (by year)")
+        for tech, _ in technique_totals.most_common(8):
+            years = technique_year[tech]
+            year_str = ", ".join(f"{y}:{c}" for y, c in sorted(years.items()) if y >= 2017)
+            emit(f"    {tech}: {year_str}")
+
+        emit("")
+        emit("6.3 Recommended future directions")
+        emit("    - Multi-strategy combinations")
+        emit("    - Foundation models / large language models in your domain")
+        emit("    - Standardized benchmark datasets")
+        emit("    - Uncertainty quantification and reliability")
+
+        # Chapter 7: Conclusions
+        emit("\n" + "─" * 80)
+        emit("Chapter 7: Conclusions")
+        emit("─" * 80)
+        emit("Suggested length: ~1 page")
+
+    print(f"✅ Outline saved: {outline_path}")
+
+    # ── Export D+E papers for writing ──
+    order = sorted(range(len(de_export)), key=de_export_keys.__getitem__)  # stable
+    de_export = [de_export[i] for i in order]
 
     de_path = os.path.join(OUT_DIR, "core_papers.json")
-    with open(de_path, "w", encoding="utf-8") as f:
-        json.dump(de_export, f, ensure_ascii=False, indent=2)
+    with open(de_path, "wb") as f:
+        f.write(json_bytes(de_export, indent=EXPORT_INDENT))
     print(f"✅ Core papers (D+E) saved: {de_path} ({len(de_export)} papers)")
 
     # ── Export A/B/C representative papers ──
@@ -415,8 +470,8 @@ def main():
             })
 
     bg_path = os.path.join(OUT_DIR, "background_papers.json")
-    with open(bg_path, "w", encoding="utf-8") as f:
-        json.dump(bg_export, f, ensure_ascii=False, indent=2)
+    with open(bg_path, "wb") as f:
+        f.write(json_bytes(bg_export, indent=EXPORT_INDENT))
     print(f"✅ Background papers saved: {bg_path} "
           f"(A={len(bg_export['A'])}, B={len(bg_export['B'])}, C={len(bg_export['C'])})")
 
@@ -424,9 +479,9 @@ def main():
     print(f"\n{'='*60}")
     print(f"📊 D+E Papers by Technique")
     print(f"{'='*60}")
-    for technique, papers in sorted_techniques:
-        e_count = sum(1 for p in papers if p["primary_category"] == "E")
-        d_count = sum(1 for p in papers if p["primary_category"] == "D")
+    for technique, papers in big_techniques + small_techniques:
+        e_count = technique_cat_counts[technique]["E"]
+        d_count = technique_cat_counts[technique]["D"]
         print(f"  {technique}: {len(papers)} papers (E={e_count}, D={d_count})")
 
     print(f"\n{'='*60}")